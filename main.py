@@ -1,7 +1,10 @@
 from src.simulator import Simulator
 from src.engine import CalibrationEngine
+from functools import lru_cache
+import hashlib
+import pickle
+import sys
 import time
-import matplotlib.pyplot as plt
 import os
 
 # --- Configuration ---
@@ -9,6 +12,8 @@ GROUND_TRUTH_FRICTION = 0.9  # The "real" hidden value we want the oracle to fin
 ORACLE_START_FRICTION = 0.2  # The oracle's incorrect starting guess.
 SIMULATION_STEPS = 150       # How many steps to run the simulation for.
 IMPULSE_TO_APPLY = (10000, 0) # The force applied to the boxes.
+CACHE_DIR = '.cache'         # Where finished calibrations are stored. Delete to re-run.
+CACHE_FORMAT = 2             # Bump whenever the cached history's layout changes.
 
 def run_phase_1():
     """
@@ -30,9 +35,7 @@ def run_phase_1():
     csm_oracle_sim.apply_impulse(IMPULSE_TO_APPLY)
 
     print(f"Running simulations for {SIMULATION_STEPS} steps...")
-    for _ in range(SIMULATION_STEPS):
-        ground_truth_sim.step()
-        csm_oracle_sim.step()
+    Simulator.step_batch((ground_truth_sim, csm_oracle_sim), SIMULATION_STEPS)
 
     ground_truth_pos = ground_truth_sim.get_object_state()
     oracle_pos = csm_oracle_sim.get_object_state()
@@ -59,8 +62,22 @@ def run_phase_2(ground_truth_final_x):
         impulse_to_apply=IMPULSE_TO_APPLY
     )
 
-    # 2. Run the calibration process.
-    final_friction_guess = engine.calibrate(ground_truth_final_x)
+    # 2. Run the calibration process, unless this exact configuration has
+    #    already been calibrated on a previous run.
+    config = (CACHE_FORMAT, GROUND_TRUTH_FRICTION, ORACLE_START_FRICTION,
+              SIMULATION_STEPS, IMPULSE_TO_APPLY, ground_truth_final_x)
+    key = hashlib.md5(repr(config).encode()).hexdigest()
+    cache_path = os.path.join(CACHE_DIR, f"{key}.pkl")
+
+    if os.path.exists(cache_path):
+        with open(cache_path, 'rb') as f:
+            engine.calibration_history, final_friction_guess = pickle.load(f)
+        print(f"--- Phase 2: Loaded cached calibration from {cache_path} ---")
+    else:
+        final_friction_guess = engine.calibrate(ground_truth_final_x)
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(cache_path, 'wb') as f:
+            pickle.dump((engine.calibration_history, final_friction_guess), f)
 
     # 3. Print the results.
     print("\n--- Calibration Results ---")
@@ -75,6 +92,20 @@ def run_phase_2(ground_truth_final_x):
     return engine
 
 
+@lru_cache(maxsize=None)
+def _convergence_axes():
+    """
+    Creates the figure and axes for the convergence plot on first use.
+    Matplotlib is imported here, with the non-interactive Agg backend, so
+    runs that never plot don't pay for the import.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    return plt.subplots(figsize=(10, 6))
+
+
 def run_phase_3(engine):
     """
     Visualizes the calibration process by plotting the error over iterations.
@@ -82,24 +113,25 @@ def run_phase_3(engine):
     print("\n--- Phase 3: Visualizing Calibration Convergence ---")
     
     history = engine.calibration_history
-    if not history:
+    if len(history) == 0:
         print("No calibration history to plot.")
         return
 
     # Extract data from the history for plotting
-    iterations = [item['iteration'] for item in history]
-    errors = [item['error'] for item in history]
+    iterations = history['iteration']
+    errors = history['error']
 
-    # Create the plot using Matplotlib
-    plt.figure(figsize=(10, 6))
-    plt.plot(iterations, errors, marker='o', linestyle='-', color='b')
+    # Create the plot using Matplotlib, reusing the figure across calls
+    fig, ax = _convergence_axes()
+    ax.clear()
+    ax.plot(iterations, errors, marker='o', linestyle='-', color='b')
     
     # Add titles and labels for clarity, making it suitable for the paper
-    plt.title('Calibration Convergence: Positional Error vs. Iteration')
-    plt.xlabel('Iteration Number')
-    plt.ylabel('Positional Error (units)')
-    plt.grid(True)
-    plt.xticks(iterations) # Ensure we have clean integer ticks for each iteration
+    ax.set_title('Calibration Convergence: Positional Error vs. Iteration')
+    ax.set_xlabel('Iteration Number')
+    ax.set_ylabel('Positional Error (units)')
+    ax.grid(True)
+    ax.set_xticks(iterations) # Ensure we have clean integer ticks for each iteration
 
     # Ensure the figures directory exists inside the paper folder
     figures_dir = 'paper/figures'
@@ -109,7 +141,7 @@ def run_phase_3(engine):
         
     # Save the plot to a file
     plot_path = os.path.join(figures_dir, 'calibration_convergence.png')
-    plt.savefig(plot_path)
+    fig.savefig(plot_path)
 
     print(f"Convergence plot saved to: {plot_path}")
     print("This plot can now be included in the LaTeX paper.")
@@ -120,8 +152,10 @@ if __name__ == "__main__":
     # Run Phase 1 to see the problem
     ground_truth_outcome = run_phase_1()
     
-    # Add a small pause so it's easy to read the output
-    time.sleep(1) 
+    # Add a small pause so it's easy to read the output, but only when
+    # someone is watching it in a terminal
+    if sys.stdout.isatty():
+        time.sleep(1)
     
     # Run Phase 2 to solve the problem and get the engine instance back
     calibration_engine = run_phase_2(ground_truth_outcome)
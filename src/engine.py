@@ -1,21 +1,135 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import lru_cache
+
+import numpy as np
+
 from src.simulator import Simulator
 
+
+# Record layout of CalibrationEngine.calibration_history
+HISTORY_DTYPE = np.dtype([('iteration', np.int64), ('guess', float), ('error', float)])
+
+
+class _SearchStopped(Exception):
+    """Raised from inside the root finder to end the search early."""
+    def __init__(self, guess, converged):
+        super().__init__(guess)
+        self.guess = guess
+        self.converged = converged
+
+
+@lru_cache(maxsize=None)
+def _trial_simulator():
+    """
+    Returns the Simulator shared by all trials in this process. Each trial
+    resets its box, so the static floor is only built once.
+    """
+    return Simulator(friction=0.0)
+
+
+@lru_cache(maxsize=256)
+def _run_trial_cached(friction, steps, impulse_x, impulse_y):
+    """
+    Runs a single Pymunk trial simulation. Trials are deterministic, so the
+    results are memoized across calls and across CalibrationEngine instances.
+
+    Args:
+        friction (float): The friction value to test.
+        steps (int): The number of steps the trial runs for.
+        impulse_x (float): The X component of the impulse to apply.
+        impulse_y (float): The Y component of the impulse to apply.
+
+    Returns:
+        float: The final X position of the object in the trial simulation.
+    """
+    trial_sim = _trial_simulator()
+    trial_sim.reset(friction, (impulse_x, impulse_y))
+
+    # Nothing re-accelerates the object after the impulse, so once it
+    # stops, its position is final.
+    trial_sim.step_many(steps, stop_at_rest=True)
+
+    final_state = trial_sim.get_object_state()
+    return final_state[0] # We only care about the final X position
+
+
 class CalibrationEngine:
     """
     Manages the process of self-calibration by adjusting a simulation's
     parameters to match observed outcomes from a "ground truth" source.
     """
-    def __init__(self, simulation_steps, impulse_to_apply):
+    def __init__(self, simulation_steps, impulse_to_apply, fast=False):
         """
         Initializes the calibration engine.
 
         Args:
             simulation_steps (int): The number of steps each trial runs for.
             impulse_to_apply (tuple): The impulse force to apply in each trial.
+            fast (bool): Run trials with the compiled box-on-floor model in
+                src.fast_sim instead of a full Pymunk simulation. Much faster,
+                but its final positions can be tens of percent short of
+                Pymunk's, so it won't recover a Pymunk ground truth.
         """
         self.simulation_steps = simulation_steps
         self.impulse = impulse_to_apply
-        self.calibration_history = [] # To store results from each iteration
+        self.fast = fast
+        # Results from each iteration, stored column by column
+        self._hist_iteration = np.empty(0, dtype=np.int64)
+        self._hist_guess = np.empty(0)
+        self._hist_error = np.empty(0)
+        self._n_hist = 0
+
+    @property
+    def calibration_history(self):
+        """
+        np.ndarray: A structured array with one record per trial so far, with
+        the fields 'iteration', 'guess' and 'error'. It is built fresh from
+        the history columns on every access, so it is a copy: changing it
+        does not change the engine. Assigning a structured array with the
+        same fields replaces the history, and assigning an empty sequence
+        clears it.
+        """
+        n = self._n_hist
+        history = np.empty(n, dtype=HISTORY_DTYPE)
+        history['iteration'] = self._hist_iteration[:n]
+        history['guess'] = self._hist_guess[:n]
+        history['error'] = self._hist_error[:n]
+        return history
+
+    @calibration_history.setter
+    def calibration_history(self, history):
+        if len(history) == 0:
+            history = np.empty(0, dtype=HISTORY_DTYPE)
+        self._hist_iteration = np.array(history['iteration'], dtype=np.int64)
+        self._hist_guess = np.array(history['guess'], dtype=float)
+        self._hist_error = np.array(history['error'], dtype=float)
+        self._n_hist = len(self._hist_guess)
+
+    def _record_iteration(self, iteration, guess, error):
+        """
+        Appends one trial to the calibration history, doubling the capacity
+        of the history arrays whenever they fill up.
+
+        Args:
+            iteration (int): The iteration number within the current run.
+            guess (float): The friction value that was tested.
+            error (float): The absolute positional error of the trial.
+        """
+        n = self._n_hist
+        if n == len(self._hist_guess):
+            capacity = max(16, 2 * n)
+            for name in ('_hist_iteration', '_hist_guess', '_hist_error'):
+                old = getattr(self, name)
+                new = np.empty(capacity, dtype=old.dtype)
+                new[:n] = old
+                setattr(self, name, new)
+
+        self._hist_iteration[n] = iteration
+        self._hist_guess[n] = guess
+        self._hist_error[n] = error
+        self._n_hist = n + 1
 
     def _run_trial(self, friction_guess):
         """
@@ -27,22 +141,74 @@ class CalibrationEngine:
         Returns:
             float: The final X position of the object in the trial simulation.
         """
-        trial_sim = Simulator(friction=friction_guess)
-        trial_sim.add_dynamic_box()
-        trial_sim.apply_impulse(self.impulse)
-        
-        for _ in range(self.simulation_steps):
-            trial_sim.step()
-            
-        final_state = trial_sim.get_object_state()
-        return final_state[0] # We only care about the final X position
+        if self.fast:
+            # Imported here so Pymunk-only engines never load Numba
+            from src.fast_sim import specialize
+
+            simulate = specialize(self.simulation_steps, self.impulse[0])
+            return simulate(friction_guess)
+
+        # Round the guess so that near-identical guesses share a cache entry
+        return _run_trial_cached(round(friction_guess, 6), self.simulation_steps,
+                                 *self.impulse)
+
+    def _run_trials_batch(self, frictions, executor=None):
+        """
+        Runs one trial simulation per friction value in parallel. Each worker
+        process reuses its own trial Simulator, so no Pymunk state is shared.
+        Fast engines run the whole batch in-process with _run_trials_vec.
+
+        Args:
+            frictions (list): The friction values to test.
+            executor (ProcessPoolExecutor, optional): The pool to run the
+                trials on. A temporary pool is created if none is given.
+
+        Returns:
+            list: The final X position of the object in each trial, in order.
+        """
+        if self.fast:
+            return self._run_trials_vec(frictions).tolist()
+        if executor is None:
+            with ProcessPoolExecutor() as executor:
+                return list(executor.map(self._run_trial, frictions))
+        return list(executor.map(self._run_trial, frictions))
+
+    def _run_trials_vec(self, frictions, dt=1/60.0, mass=10.0, g=900.0):
+        """
+        Runs the fast box-on-floor model for many friction values at once,
+        with one compiled loop over the closed-form final_position, so batch
+        trials give exactly the results of _run_trial.
+
+        Args:
+            frictions (array-like): The friction values to test.
+            dt (float): The time delta for each physics step.
+            mass (float): The mass of the box.
+            g (float): The magnitude of gravity.
+
+        Returns:
+            np.ndarray: The final X position of the box in each trial.
+        """
+        from src.fast_sim import final_positions
+
+        frictions = np.asarray(frictions, dtype=float)
+        return final_positions(frictions, float(self.impulse[0]),
+                               self.simulation_steps, dt, mass, g)
 
     def calibrate(self, ground_truth_x_pos, max_iterations=10, tolerance=1.0):
         """
         Runs the calibration loop to find the friction parameter that results
         in a final position matching the ground_truth_x_pos.
 
-        This implementation uses a binary search algorithm.
+        This implementation uses Brent's method. The final position drops
+        smoothly and monotonically as friction rises, so Brent's interpolation
+        steps need far fewer trial simulations than a plain binary search.
+        If the search range does not bracket the target, it falls back to
+        a binary search.
+
+        The range is not narrowed around an interpolated estimate before the
+        search starts: Brent's first interior guess already is the linear
+        interpolation between the trials at the two ends, and narrowing up
+        front measured one or two extra trials per calibration.
 
         Args:
             ground_truth_x_pos (float): The target final X position to match.
@@ -57,47 +223,261 @@ class CalibrationEngine:
         # We assume friction is between 0.0 and 1.0 for the search
         low_bound = 0.0
         high_bound = 1.0
-        best_guess = -1
+        residuals = {} # Trial results already simulated in this run
+
+        def residual(current_guess):
+            # Brent's method re-evaluates the bracket ends, so reuse them.
+            if current_guess in residuals:
+                return residuals[current_guess]
 
-        for i in range(max_iterations):
-            # Guess the midpoint of our current search range
-            current_guess = (low_bound + high_bound) / 2
-            
             # Run a simulation with that guess
             trial_result_x = self._run_trial(current_guess)
-            
-            error = abs(trial_result_x - ground_truth_x_pos)
+            residuals[current_guess] = trial_result_x - ground_truth_x_pos
+            error = abs(residuals[current_guess])
+            iteration = len(residuals)
 
             # Store history for later analysis/plotting
-            self.calibration_history.append({
-                'iteration': i + 1,
-                'guess': current_guess,
-                'error': error
-            })
+            self._record_iteration(iteration, current_guess, error)
             
-            print(f"Iteration {i+1:02d}: Guess={current_guess:.4f}, Error={error:.2f}")
+            print(f"Iteration {iteration:02d}: Guess={current_guess:.4f}, Error={error:.2f}")
 
-            # Check for success
+            # Check for success, or whether we have run out of guesses
             if error <= tolerance:
-                print(f"\nCalibration successful! Converged within tolerance.")
-                best_guess = current_guess
-                break
-
-            # --- Binary Search Logic ---
-            # If our trial object went farther than the real one, it means
-            # our friction guess was too LOW. So, we need to search in the
-            # upper half of the current range.
-            if trial_result_x > ground_truth_x_pos:
+                raise _SearchStopped(current_guess, converged=True)
+            if iteration >= max_iterations:
+                raise _SearchStopped(current_guess, converged=False)
+            return residuals[current_guess]
+
+        try:
+            # A positive residual means the trial object went farther than
+            # the real one, i.e. our friction guess was too LOW.
+            if residual(low_bound) * residual(high_bound) < 0:
+                # Imported here so the Pymunk-only paths don't pay for SciPy
+                from scipy.optimize import brentq
+
+                best_guess = brentq(residual, low_bound, high_bound,
+                                    xtol=1e-6, maxiter=max_iterations)
+                # Brent only returns on its own once the range is too narrow
+                outcome = 'stalled'
+            else:
+                best_guess = self._bisect(residual, low_bound, high_bound,
+                                          max_iterations)
+                outcome = 'exhausted'
+        except _SearchStopped as stop:
+            best_guess = stop.guess
+            outcome = 'converged' if stop.converged else 'exhausted'
+
+        if outcome == 'converged':
+            print(f"\nCalibration successful! Converged within tolerance.")
+        elif outcome == 'stalled':
+            print(f"\nCalibration stopped: the friction range shrank to 1e-6 before reaching tolerance.")
+        else:
+            print(f"\nCalibration finished after max iterations.")
+
+        print("------------------------------------------")
+        return best_guess
+
+    @staticmethod
+    def _bisect(residual, low_bound, high_bound, max_iterations):
+        """
+        Binary search fallback for when the search range does not bracket
+        the target. It walks towards whichever bound lies closer to it.
+
+        Args:
+            residual (callable): Maps a friction guess to the signed error.
+            low_bound (float): The lower end of the friction range.
+            high_bound (float): The upper end of the friction range.
+            max_iterations (int): The maximum number of guesses to make.
+
+        Returns:
+            float: The last friction guess.
+        """
+        current_guess = low_bound
+        for _ in range(max_iterations):
+            current_guess = (low_bound + high_bound) / 2
+
+            # If our trial object went farther than the real one, our friction
+            # guess was too LOW, so search the upper half. Otherwise search
+            # the lower half.
+            if residual(current_guess) > 0:
                 low_bound = current_guess
-            # Otherwise, our friction guess was too HIGH, and the object
-            # didn't travel far enough. We need to search in the lower half.
             else:
                 high_bound = current_guess
-            
-            best_guess = current_guess
+        return current_guess
+
+    def calibrate_parallel(self, ground_truth_x_pos, max_rounds=10, tolerance=1.0,
+                           workers=None):
+        """
+        Runs the calibration as a parallel multi-section search. Each round
+        simulates one friction guess per worker, spaced evenly inside the
+        current search range, and shrinks the range to the gap between the
+        two neighbouring guesses that straddle the target.
+
+        Once both ends of the range have been simulated, the guess closest to
+        the false-position estimate (a linear interpolation between the ends'
+        errors) is moved onto it. The Illinois variant halves the error kept
+        for an end that survives two rounds in a row, so the estimate does
+        not stall against it. On this smooth problem the interpolated guess
+        usually lands within tolerance long before the grid would.
+
+        Args:
+            ground_truth_x_pos (float): The target final X position to match.
+            max_rounds (int): The maximum number of parallel rounds to run.
+            tolerance (float): The acceptable error margin to stop calibrating.
+            workers (int, optional): The number of guesses per round. Defaults
+                to the number of CPUs, or to 16 for fast engines, which run
+                each round as a single vectorized batch.
+
+        Returns:
+            float: The best guess for the friction parameter.
+        """
+        print("--- Phase 2: Starting Parallel Calibration Loop ---")
+
+        if self.fast:
+            workers = workers or 16
+        workers = workers or os.cpu_count() or 1
+        low_bound = 0.0
+        high_bound = 1.0
+        low_residual = None # Signed trial errors at the bounds, once simulated
+        high_residual = None
+        last_moved = None
+        best_guess = -1
+        best_error = float('inf')
+        iteration = 0
+
+        pool = nullcontext() if self.fast else ProcessPoolExecutor(max_workers=workers)
+        with pool as executor:
+            for round_number in range(max_rounds):
+                # Evenly spaced interior guesses, excluding the bounds themselves
+                step = (high_bound - low_bound) / (workers + 1)
+                guesses = [low_bound + step * (k + 1) for k in range(workers)]
+                if low_residual is not None and high_residual is not None:
+                    estimate = low_bound - low_residual * (high_bound - low_bound) / (high_residual - low_residual)
+                    nearest = min(range(workers), key=lambda k: abs(guesses[k] - estimate))
+                    guesses[nearest] = estimate
+                    guesses.sort()
+                results = self._run_trials_batch(guesses, executor)
 
-        if error > tolerance:
-             print(f"\nCalibration finished after max iterations.")
+                low_moved = high_moved = False
+                for current_guess, trial_result_x in zip(guesses, results):
+                    iteration += 1
+                    error = abs(trial_result_x - ground_truth_x_pos)
+                    self._record_iteration(iteration, current_guess, error)
+                    print(f"Iteration {iteration:02d}: Guess={current_guess:.4f}, Error={error:.2f}")
+
+                    if error < best_error:
+                        best_guess, best_error = current_guess, error
+
+                    # Guesses are in increasing order, so the target lies
+                    # above every guess whose object went too far.
+                    residual = trial_result_x - ground_truth_x_pos
+                    if residual > 0:
+                        low_bound, low_residual, low_moved = current_guess, residual, True
+                    elif high_bound > current_guess:
+                        high_bound, high_residual, high_moved = current_guess, residual, True
+
+                # Illinois step: halve the error at an end kept twice in a row
+                moved = 'low' if not high_moved else 'high' if not low_moved else None
+                if moved == last_moved == 'low' and high_residual is not None:
+                    high_residual /= 2
+                elif moved == last_moved == 'high' and low_residual is not None:
+                    low_residual /= 2
+                last_moved = moved
+
+                print(f"Round {round_number+1:02d}: Range=[{low_bound:.4f}, {high_bound:.4f}]")
+
+                if best_error <= tolerance:
+                    print(f"\nCalibration successful! Converged within tolerance.")
+                    break
+            else:
+                print(f"\nCalibration finished after max rounds.")
+
+        print("------------------------------------------")
+        return best_guess
+
+    def calibrate_batch(self, targets, max_rounds=10, tolerance=1.0, batch_size=None):
+        """
+        Calibrates the friction parameter against several ground truth
+        observations at once. Each round spreads one batch of friction guesses
+        evenly over the search ranges of the targets that have not converged
+        yet, and simulates the whole batch in parallel. Targets that share a
+        search range share its guesses, so no friction is tested twice.
+
+        The final position falls steadily as friction rises, so every trial
+        narrows the search range of every target, not just the one it was
+        placed for.
+
+        Args:
+            targets (list): The target final X positions to match.
+            max_rounds (int): The maximum number of parallel rounds to run.
+            tolerance (float): The acceptable error margin to stop calibrating.
+            batch_size (int, optional): The number of guesses per round.
+                Defaults to the number of CPUs, or to 16 for fast engines.
+                Every distinct search range gets at least one guess.
+
+        Each trial is recorded in the calibration history with its smallest
+        error against the targets it was placed for.
+
+        Returns:
+            list: The best guess for the friction parameter for each target.
+        """
+        if not targets:
+            return []
+
+        print("--- Phase 2: Starting Batch Calibration Loop ---")
+
+        if self.fast:
+            batch_size = batch_size or 16
+        batch_size = batch_size or os.cpu_count() or 1
+        bounds = [[0.0, 1.0] for _ in targets]
+        best = [[-1, float('inf')] for _ in targets] # [guess, error] per target
+        iteration = 0
+
+        pool = nullcontext() if self.fast else ProcessPoolExecutor(max_workers=batch_size)
+        with pool as executor:
+            for round_number in range(max_rounds):
+                active = [i for i, (_, error) in enumerate(best) if error > tolerance]
+                # Every range lies between two frictions already tested, so
+                # two targets' ranges are either the same or don't overlap.
+                ranges = {}
+                for i in active:
+                    ranges.setdefault(tuple(bounds[i]), []).append(i)
+                per_range = max(1, batch_size // len(ranges))
+
+                guesses = []
+                owners = [] # The targets each guess was placed for
+                for (low_bound, high_bound), range_targets in ranges.items():
+                    step = (high_bound - low_bound) / (per_range + 1)
+                    guesses.extend(low_bound + step * (k + 1) for k in range(per_range))
+                    owners.extend([range_targets] * per_range)
+                results = self._run_trials_batch(guesses, executor)
+
+                for range_targets, current_guess, trial_result_x in zip(owners, guesses, results):
+                    iteration += 1
+                    owner = min(range_targets, key=lambda i: abs(trial_result_x - targets[i]))
+                    error = abs(trial_result_x - targets[owner])
+                    self._record_iteration(iteration, current_guess, error)
+                    print(f"Iteration {iteration:02d}: Target={owner+1}, Guess={current_guess:.4f}, Error={error:.2f}")
+
+                for i, target in enumerate(targets):
+                    for current_guess, trial_result_x in zip(guesses, results):
+                        error = abs(trial_result_x - target)
+                        if error < best[i][1]:
+                            best[i] = [current_guess, error]
+
+                        # The object went too far, so the friction is too LOW
+                        if trial_result_x > target:
+                            bounds[i][0] = max(bounds[i][0], current_guess)
+                        else:
+                            bounds[i][1] = min(bounds[i][1], current_guess)
+
+                print(f"Round {round_number+1:02d}: Trials={len(guesses)}, Targets left={len(active)}")
+
+                if all(error <= tolerance for _, error in best):
+                    print(f"\nCalibration successful! All targets converged within tolerance.")
+                    break
+            else:
+                print(f"\nCalibration finished after max rounds.")
 
         print("------------------------------------------")
-        return best_guess
\ No newline at end of file
+        return [guess for guess, _ in best]
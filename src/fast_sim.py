@@ -0,0 +1,170 @@
+import math
+from functools import lru_cache
+
+import numpy as np
+from numba import njit
+
+# The static floor in Simulator spans x = -500..500. Past its right edge the
+# box is airborne and keeps its horizontal velocity.
+FLOOR_EDGE_X = 500.0
+
+
+@njit(cache=True)
+def simulate_box(friction, impulse_x, steps, dt=1/60.0, mass=10.0, g=900.0):
+    """
+    Simulates the calibration scene, a box pushed along a flat floor, without
+    Pymunk. The box slides with Coulomb friction while it is over the floor
+    and coasts once it has passed the floor's edge, integrated with the same
+    semi-implicit Euler scheme Pymunk uses.
+
+    final_position computes the same result in closed form.
+
+    This is an approximation of the Pymunk scene: it ignores the initial drop
+    onto the floor and the box tipping over the edge. With 150 steps its
+    final positions fall short of Simulator's by 13.5% at friction 1.0 and
+    impulse 10000 (1007.75 against 1165.60), 25% at impulse 3000 and 72% at
+    impulse 1000, so it is not a substitute for Pymunk when calibrating
+    against Pymunk ground truth: a true friction of 0.9 calibrates to about
+    0.85.
+
+    Args:
+        friction (float): The coefficient of friction between box and floor.
+        impulse_x (float): The horizontal impulse applied to the box.
+        steps (int): The number of steps to simulate.
+        dt (float): The time delta for each physics step.
+        mass (float): The mass of the box.
+        g (float): The magnitude of gravity.
+
+    Returns:
+        float: The final X position of the box.
+    """
+    velocity = impulse_x / mass
+    position = 0.0
+    for _ in range(steps):
+        if position < FLOOR_EDGE_X:
+            velocity = max(velocity - friction * g * dt, 0.0)
+            if velocity == 0.0:
+                break # The box has stopped and nothing will move it again
+        position += velocity * dt
+    return position
+
+
+@njit(cache=True)
+def _sliding_position(n, velocity, decel, dt):
+    """Position of the box after n steps of sliding with friction."""
+    return dt * (n * velocity - decel * n * (n + 1) / 2)
+
+
+@njit(cache=True)
+def _edge_step(velocity, decel, steps, dt):
+    """
+    Returns the first step after which a box sliding with friction is past
+    the floor's edge, or steps + 1 if it never gets there.
+    """
+    # The smaller root of
+    # dt * (n * velocity - decel * n * (n + 1) / 2) = FLOOR_EDGE_X, nudged
+    # to the right integer in case of rounding. If both roots fall between
+    # the same two integers, the peak position lies between steps and no
+    # step actually reaches the edge, so the box never leaves the floor.
+    b = velocity - decel / 2
+    discriminant = b * b - 2 * decel * FLOOR_EDGE_X / dt
+    edge_step = steps + 1
+    if discriminant >= 0.0:
+        edge_step = math.ceil((b - math.sqrt(discriminant)) / decel)
+        while edge_step > 1 and _sliding_position(edge_step - 1, velocity, decel, dt) >= FLOOR_EDGE_X:
+            edge_step -= 1
+        if _sliding_position(edge_step, velocity, decel, dt) < FLOOR_EDGE_X:
+            edge_step += 1
+            if _sliding_position(edge_step, velocity, decel, dt) < FLOOR_EDGE_X:
+                edge_step = steps + 1
+    return edge_step
+
+
+@njit(cache=True)
+def final_position(friction, impulse_x, steps, dt=1/60.0, mass=10.0, g=900.0):
+    """
+    Computes the result of simulate_box in closed form, without stepping.
+
+    While friction acts, the box loses the same speed every step, so its
+    position after n steps is a quadratic in n. Solving that quadratic gives
+    the step at which the box passes the floor's edge or comes to rest, and
+    the rest of the trajectory is either standing still or coasting.
+
+    Args:
+        friction (float): The coefficient of friction between box and floor.
+        impulse_x (float): The horizontal impulse applied to the box.
+        steps (int): The number of steps to simulate.
+        dt (float): The time delta for each physics step.
+        mass (float): The mass of the box.
+        g (float): The magnitude of gravity.
+
+    Returns:
+        float: The final X position of the box.
+    """
+    velocity = impulse_x / mass
+    decel = friction * g * dt # Speed lost per step while on the floor
+    if decel <= 0.0:
+        return velocity * dt * steps
+
+    # The box stops on step stop_step, before moving, unless it has left
+    # the floor by then.
+    stop_step = math.ceil(velocity / decel)
+    edge_step = _edge_step(velocity, decel, steps, dt)
+
+    if stop_step <= min(edge_step, steps):
+        return _sliding_position(stop_step - 1, velocity, decel, dt)
+
+    n = min(edge_step, steps)
+    position = _sliding_position(n, velocity, decel, dt)
+    return position + (steps - n) * (velocity - n * decel) * dt
+
+
+@njit(cache=True)
+def final_positions(frictions, impulse_x, steps, dt=1/60.0, mass=10.0, g=900.0):
+    """
+    Computes final_position for many friction values in one compiled loop.
+
+    Args:
+        frictions (np.ndarray): The coefficients of friction to test.
+        impulse_x (float): The horizontal impulse applied to the box.
+        steps (int): The number of steps to simulate.
+        dt (float): The time delta for each physics step.
+        mass (float): The mass of the box.
+        g (float): The magnitude of gravity.
+
+    Returns:
+        np.ndarray: The final X position of the box in each trial.
+    """
+    result = np.empty(len(frictions))
+    for i in range(len(frictions)):
+        result[i] = final_position(frictions[i], impulse_x, steps, dt, mass, g)
+    return result
+
+
+@lru_cache(maxsize=None)
+def specialize(steps, impulse_x, dt=1/60.0, mass=10.0, g=900.0):
+    """
+    Compiles final_position for one fixed scene configuration. Everything but
+    the friction becomes a compile-time constant, which lets LLVM fold the
+    scene parameters into the arithmetic, and the returned function takes a
+    single argument, which is far cheaper to call from Python than
+    final_position with its default arguments left out.
+
+    Args:
+        steps (int): The number of steps to simulate.
+        impulse_x (float): The horizontal impulse applied to the box.
+        dt (float): The time delta for each physics step.
+        mass (float): The mass of the box.
+        g (float): The magnitude of gravity.
+
+    Returns:
+        callable: Maps a friction value to the final X position of the box.
+    """
+    steps = int(steps)
+    impulse_x = float(impulse_x)
+
+    @njit(cache=True)
+    def simulate_specialized(friction):
+        return final_position(friction, impulse_x, steps, dt, mass, g)
+
+    return simulate_specialized
@@ -1,5 +1,13 @@
+from functools import partial
+
 import pymunk
 
+try:
+    # Private Pymunk module, used to call Chipmunk's step function directly
+    from pymunk._chipmunk_cffi import lib as chipmunk
+except ImportError:
+    chipmunk = None
+
 class Simulator:
     """
     Manages a 2D physics simulation using the Pymunk library.
@@ -32,7 +40,7 @@ class Simulator:
         floor_shape.friction = 1.0  # High friction for the floor
         self.space.add(floor_shape)
 
-    def add_dynamic_box(self, position=(0, 50), size=(50, 50), mass=10):
+    def add_dynamic_box(self, position=(0, 50), size=(50, 50), mass=10, moment=None):
         """
         Adds a single dynamic box to the simulation. This will be the object
         we track and apply forces to.
@@ -41,11 +49,15 @@ class Simulator:
             position (tuple): The initial (x, y) position of the box.
             size (tuple): The (width, height) of the box.
             mass (int): The mass of the box.
+            moment (float, optional): The box's moment of inertia, if already
+                known. Computed from the mass and size when omitted.
             
         Returns:
             pymunk.Body: The body of the created box.
         """
-        body = pymunk.Body(mass, pymunk.moment_for_box(mass, size))
+        if moment is None:
+            moment = pymunk.moment_for_box(mass, size)
+        body = pymunk.Body(mass, moment)
         body.position = position
         
         shape = pymunk.Poly.create_box(body, size)
@@ -55,6 +67,30 @@ class Simulator:
         self.object_body = body
         return body
 
+    def reset(self, friction, impulse=None):
+        """
+        Replaces the dynamic object with a fresh box using a new friction
+        value, leaving the static floor in place. This lets one simulation
+        space be reused for many trials instead of rebuilding it each time.
+        
+        Args:
+            friction (float): The new coefficient of friction for this world.
+            impulse (tuple, optional): An (x, y) impulse to apply to the new box.
+            
+        Returns:
+            pymunk.Body: The body of the new box.
+        """
+        moment = None
+        if self.object_body:
+            # The new box has the same mass and size, so reuse its moment
+            moment = self.object_body.moment
+            self.space.remove(self.object_body, *self.object_body.shapes)
+        self.friction = friction
+        body = self.add_dynamic_box(moment=moment)
+        if impulse is not None:
+            self.apply_impulse(impulse)
+        return body
+
     def apply_impulse(self, impulse=(5000, 0)):
         """
         Applies a one-time force (an impulse) to the dynamic object.
@@ -74,6 +110,62 @@ class Simulator:
         """
         self.space.step(dt)
 
+    def step_many(self, steps, dt=1/60.0, stop_at_rest=False):
+        """
+        Advances the simulation by several time steps in one call.
+        
+        Only the first step goes through pymunk.Space.step, which validates
+        new bodies and applies any pending additions, removals and callbacks.
+        The rest call Chipmunk's cpSpaceStep directly, skipping that per-step
+        Python bookkeeping. Nothing in these scenes changes the space while
+        it is stepping, so the result is identical. If Pymunk's private
+        Chipmunk binding is unavailable, every step uses Space.step.
+        
+        Args:
+            steps (int): The number of time steps to advance.
+            dt (float): The time delta for each physics step.
+            stop_at_rest (bool): Stop early once the dynamic object is at rest.
+        """
+        if steps <= 0:
+            return
+        self.space.step(dt)
+        if stop_at_rest and self.is_at_rest():
+            return
+
+        if chipmunk is not None:
+            space_step = partial(chipmunk.cpSpaceStep, self.space._space)
+        else:
+            space_step = self.space.step
+        for _ in range(steps - 1):
+            space_step(dt)
+            if stop_at_rest and self.is_at_rest():
+                return
+
+    @staticmethod
+    def step_batch(sims, steps=1, dt=1/60.0):
+        """
+        Advances several independent simulations by the same number of steps.
+        
+        Args:
+            sims (iterable): The Simulator instances to advance.
+            steps (int): The number of time steps to advance each simulation.
+            dt (float): The time delta for each physics step.
+        """
+        for sim in sims:
+            sim.step_many(steps, dt)
+
+    def is_at_rest(self, threshold=1e-3):
+        """
+        Checks whether the dynamic object has (practically) stopped moving.
+        
+        Args:
+            threshold (float): The speed below which the object counts as at rest.
+            
+        Returns:
+            bool: True if the object's speed is below the threshold.
+        """
+        return self.object_body is not None and self.object_body.velocity.length < threshold
+
     def get_object_state(self):
         """
         Gets the current state (position) of the dynamic object.